@@ -1,6 +1,16 @@
 import streamlit as st
+import hashlib
 import os
-from search_script import smart_search_with_file
+from resume_parser_util import extract_text_from_file
+from search_script import smart_search
+
+
+@st.cache_data(show_spinner=False)
+def load_resume_text(digest, file_name, _raw_bytes):
+    """Parse each unique upload once; Streamlit keys the cache on digest + name only."""
+    # Parsed straight from memory - the name only tells us which parser to use
+    return extract_text_from_file(file_name, data=_raw_bytes)
+
 
 # 1. PAGE CONFIG
 st.set_page_config(page_title="Smart CV Matcher", layout="wide")
@@ -42,15 +52,21 @@ if prompt := st.chat_input("Ask me to find jobs or analyze your CV..."):
         if uploaded_file is None:
             st.warning("Please upload a resume in the sidebar first!")
         else:
-            # Save file temporarily to process it
-            with open("temp_resume", "wb") as f:
-                f.write(uploaded_file.getbuffer())
+            # Hash the upload so follow-up turns skip re-parsing the same CV
+            buffer = uploaded_file.getbuffer()
+            digest = hashlib.blake2b(buffer, digest_size=16).hexdigest()
 
             with st.spinner("Analyzing your CV and searching for matching roles..."):
-                results, intent = smart_search_with_file("temp_resume", prompt)
+                resume_text = load_resume_text(digest, uploaded_file.name, buffer)
+                results, intent = smart_search(resume_text, prompt)
 
             # Handle cases where no results were found
-            if not results or not results.get("ids") or not results["ids"][0]:
+            notice = intent.get("notice") if intent else None
+            if notice:
+                # The search was skipped: tell the user what was missing
+                st.markdown(notice)
+                st.session_state.messages.append({"role": "assistant", "content": notice})
+            elif not results or not results.get("ids") or not results["ids"][0]:
                 title = intent.get("title") if intent else None
                 location = intent.get("location") if intent else None
                 summary_bits = []
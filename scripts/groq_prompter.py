@@ -1,42 +1,224 @@
+import asyncio
+import concurrent.futures
+import hashlib
 import json
-from groq import Groq
+import re
+import threading
+import diskcache
+import httpx
+from groq import AsyncGroq
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+
+def _make_client():
+    return AsyncGroq(
+        api_key=os.getenv("GROQ_API_KEY"),
+        # One pooled HTTP client, so gathered calls reuse warm TLS connections
+        http_client=httpx.AsyncClient(
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=40),
+            timeout=30
+        ),
+        timeout=30,
+        max_retries=3  # SDK retries 429 / 5xx / connection errors with exponential backoff
+    )
+
+# All Groq calls run on one long-lived event loop in a background thread, so the
+# async client (and its connection pool) always stays on the same loop and sync
+# callers like Streamlit / search_script can simply block on the result.
+# Both are per process: a child forked after they were created has no loop thread
+# (and must not reuse the parent's sockets), so they're rebuilt when the pid changes.
+_runtime_lock = threading.Lock()
+_runtime_pid = None
+_loop = None
+client = None
+
+# Upper bound on one blocking call: 4 attempts x 30s HTTP timeout plus backoff
+RUN_TIMEOUT = 150  # seconds
+
+def _get_loop():
+    global _runtime_pid, _loop, client
+    if _runtime_pid != os.getpid():
+        with _runtime_lock:
+            if _runtime_pid != os.getpid():
+                _loop = asyncio.new_event_loop()
+                threading.Thread(target=_loop.run_forever, daemon=True).start()
+                client = _make_client()
+                _runtime_pid = os.getpid()
+    return _loop
+
+# Groq answers also persist on disk, so a restarted app (or the CLI) doesn't pay
+# the round-trip again for a resume + query it has already seen. Opened on first
+# use (not at import), and per process like the loop above.
+INTENT_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "intent_cache")
+INTENT_CACHE_TTL = 3 * 24 * 3600  # seconds
+_intent_cache_lock = threading.Lock()
+_intent_cache_pid = None
+_intent_disk_cache = None
+
+def _get_intent_disk_cache():
+    global _intent_cache_pid, _intent_disk_cache
+    if _intent_cache_pid != os.getpid():
+        with _intent_cache_lock:
+            if _intent_cache_pid != os.getpid():
+                _intent_disk_cache = diskcache.Cache(INTENT_CACHE_DIR)
+                _intent_cache_pid = os.getpid()
+    return _intent_disk_cache
+
+def _intent_cache_get(key):
+    return _get_intent_disk_cache().get(key)
+
+def _intent_cache_set(key, intent):
+    _get_intent_disk_cache().set(key, intent, expire=INTENT_CACHE_TTL)
+
+def _run(coro):
+    future = asyncio.run_coroutine_threadsafe(coro, _get_loop())
+    try:
+        return future.result(timeout=RUN_TIMEOUT)
+    except concurrent.futures.TimeoutError:
+        future.cancel()
+        raise
 
 VALID_EXPERIENCE = ["Entry level", "Associate", "Mid-Senior level", "Director", "Executive", "Internship"]
 VALID_WORK_TYPES = ["FULL_TIME", "CONTRACT", "PART_TIME", "TEMPORARY", "INTERNSHIP", "VOLUNTEER"]
 
-def get_filter_json(user_prompt):
-    system_prompt = f"""
-    You are a Search Intent Extractor. Extract filters from the user's request.
-    
-    HARD CATEGORIES (Must match one of these or be null):
-    - experience: {VALID_EXPERIENCE}
-    - work_type: {VALID_WORK_TYPES}
-    
-    FUZZY CATEGORIES (Extract the name/term the user mentioned):
-    - location (e.g., "NYC", "London", "Remote")
-    - title (e.g., "Python Developer")
-    - company (e.g., "Google")
+# Built once and kept terse: this prefix is sent on every intent call, and Groq's
+# prefill time grows with input tokens. JSON enums replace the prose explainer.
+FILTER_SYSTEM_PROMPT = (
+    "Extract job-search filters from the user's request. Return ONLY a JSON object with keys "
+    '"experience", "work_type", "location", "title", "company"; use null if not mentioned. '
+    f"experience must be one of {json.dumps(VALID_EXPERIENCE)}. "
+    f"work_type must be one of {json.dumps(VALID_WORK_TYPES)}. "
+    "location, title and company are the terms the user wrote."
+)
+
+# Local fast path for short, well-formed preference text ("senior full time python
+# developer in London"), so it can skip the Groq round-trip. It runs on the user's
+# own words only (not the RESUME + USER PREFERENCES prompt), so it only answers when
+# those words pin down all four fields; anything else is left to the LLM, which can
+# also read a missing level off the resume.
+_WORK_TYPE_RE = re.compile(r"\b(full[- ]?time|part[- ]?time|contract|temporary|internship|volunteer)\b", re.I)
+_EXPERIENCE_RE = re.compile(r"\b(entry[- ]level|junior|graduate|associate|mid[- ]senior|senior|director|executive|intern)\b", re.I)
+_TITLE_IN_LOCATION_RE = re.compile(
+    r"^(?P<title>[a-z][\w+#./ -]*?)(?:\s+(?:jobs?|roles?|positions?|openings?))?\s+in\s+(?P<location>[a-z][\w .,'-]*)$", re.I
+)
+# Conversational words mean the prompt needs real understanding
+_NEEDS_LLM_RE = re.compile(r"\b(i|me|my|want|looking|find|show|any|some|please|with|without|not|no|at|or|remote|hybrid|on[- ]?site)\b", re.I)
+# A preposition inside the title or location means extra structure we can't
+# place ("Director of Sales", "london in summer", "london for fintech")
+_PREPOSITION_RE = re.compile(r"\b(in|for|of|on|near|around|during|from|to|and)\b", re.I)
+GENERIC_TITLES = {"job", "jobs", "role", "roles", "position", "positions", "opening", "openings",
+                  "vacancy", "vacancies", "work"}
+
+WORK_TYPE_TERMS = {"fulltime": "FULL_TIME", "parttime": "PART_TIME", "contract": "CONTRACT",
+                   "temporary": "TEMPORARY", "internship": "INTERNSHIP", "volunteer": "VOLUNTEER"}
+EXPERIENCE_TERMS = {"entrylevel": "Entry level", "junior": "Entry level", "graduate": "Entry level",
+                    "associate": "Associate", "midsenior": "Mid-Senior level", "senior": "Mid-Senior level",
+                    "director": "Director", "executive": "Executive", "intern": "Internship"}
+
+# Qualifier words that start a title of their own rather than qualifying one
+# ("Executive Assistant" isn't an executive-level assistant)
+QUALIFIED_TITLES = {
+    "executive assistant", "executive chef", "executive director", "executive producer",
+    "executive officer", "executive secretary", "associate professor", "associate director",
+    "associate attorney", "associate editor", "associate dean", "associate consultant",
+    "contract manager", "contract administrator", "contract specialist", "contract analyst",
+    "contract attorney", "contract negotiator", "senior living", "senior care",
+    "graduate assistant", "graduate nurse", "graduate teaching", "graduate research",
+    "intern architect", "temporary staffing", "volunteer coordinator", "volunteer manager",
+    "internship coordinator",
+}
+
+def _term_key(term):
+    return re.sub(r"[- ]", "", term.lower())
 
-    Return ONLY JSON. If a filter is not mentioned, use null.
-    Example: "Junior dev in New York" -> {{"experience": "Entry level", "location": "New York", "title": "dev"}}
+def quick_filter(user_query, is_known_location):
     """
-    
-    response = client.chat.completions.create(
-        model="llama-3.3-70b-versatile",
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
-        ],
-        response_format={"type": "json_object"} # Forces the model to give clean JSON
-    )
-    return json.loads(response.choices[0].message.content)
+    Returns an intent dict for simple preference text, or None if Groq should decide.
+    is_known_location(location) -> bool is the confidence check: the location must
+    match the job DB's vocabulary, otherwise the local parse isn't trusted.
+    """
+    text = " ".join(user_query.split())
+    if not text or len(text) > 80 or _NEEDS_LLM_RE.search(text):
+        return None
 
-def get_search_query_llm(resume_text, user_query=""):
+    intent = {"experience": None, "work_type": None, "location": None, "title": None, "company": None}
+    # Level / work-type words only count as leading qualifiers ("senior full time ...")
+    while True:
+        level = _EXPERIENCE_RE.match(text)
+        work_type = _WORK_TYPE_RE.match(text)
+        qualifier = level or work_type
+        if qualifier:
+            rest = text[qualifier.end():].split(None, 1)
+            if rest and f"{qualifier.group(1)} {rest[0]}".lower() in QUALIFIED_TITLES:
+                return None
+        if level and intent["experience"] is None:
+            intent["experience"] = EXPERIENCE_TERMS[_term_key(level.group(1))]
+            text = text[level.end():].lstrip()
+        elif work_type and intent["work_type"] is None:
+            intent["work_type"] = WORK_TYPE_TERMS[_term_key(work_type.group(1))]
+            text = text[work_type.end():].lstrip()
+        else:
+            break
+    # Anywhere else they're part of the title ("Sales Director") or ambiguous
+    # ("part time or contract"), which only the LLM can settle
+    if _EXPERIENCE_RE.search(text) or _WORK_TYPE_RE.search(text):
+        return None
+
+    match = _TITLE_IN_LOCATION_RE.match(text)
+    if not match:
+        return None
+    title = match.group("title").strip()
+    location = match.group("location").strip(" .,")
+    if title.lower() in GENERIC_TITLES:
+        return None  # "jobs in London": no actual role given
+    if _PREPOSITION_RE.search(title) or _PREPOSITION_RE.search(location):
+        return None
+    if not is_known_location(location):
+        return None
+    if intent["experience"] is None or intent["work_type"] is None:
+        return None  # Groq fills these from the resume and the wording
+    intent["title"] = title
+    intent["location"] = location
+    return intent
+
+# Intent is a pure function of the prompt, and Streamlit reruns resend the same one.
+# functools.lru_cache can't wrap coroutines, so keep a small bounded dict instead
+# (only ever touched from the _loop thread, so no lock needed).
+FILTER_CACHE_SIZE = 512
+_filter_cache = {}
+
+def _intent_key(user_prompt):
+    return hashlib.blake2b(user_prompt.encode("utf-8"), digest_size=16).hexdigest()
+
+async def get_filter_json_async(user_prompt):
+    if user_prompt in _filter_cache:
+        return _filter_cache[user_prompt]
+
+    # diskcache is blocking sqlite I/O (including the first open), so it runs in
+    # the default executor rather than stalling every other Groq call on this loop
+    loop = asyncio.get_running_loop()
+    key = _intent_key(user_prompt)
+    intent = await loop.run_in_executor(None, _intent_cache_get, key)
+    if intent is None:
+        response = await client.chat.completions.create(
+            model="llama-3.3-70b-versatile",
+            messages=[
+                {"role": "system", "content": FILTER_SYSTEM_PROMPT},
+                {"role": "user", "content": user_prompt}
+            ],
+            response_format={"type": "json_object"} # Forces the model to give clean JSON
+        )
+        intent = json.loads(response.choices[0].message.content)
+        await loop.run_in_executor(None, _intent_cache_set, key, intent)
+
+    _filter_cache[user_prompt] = intent
+    if len(_filter_cache) > FILTER_CACHE_SIZE:
+        _filter_cache.pop(next(iter(_filter_cache)))  # drop the oldest entry
+    return intent
+
+async def get_search_query_llm_async(resume_text, user_query=""):
     """
     Summarizes a CV and user intent into a condensed string of 
     searchable keywords for Vector DB retrieval.
@@ -55,7 +237,7 @@ def get_search_query_llm(resume_text, user_query=""):
     
     prompt = f"RESUME: {resume_text[:2500]}\nUSER REQUEST: {user_query}"
     
-    response = client.chat.completions.create(
+    response = await client.chat.completions.create(
         model="llama-3.3-70b-versatile",
         messages=[
             {"role": "system", "content": system_prompt},
@@ -65,20 +247,49 @@ def get_search_query_llm(resume_text, user_query=""):
     )
     return response.choices[0].message.content.strip()
 
-def explain_matches(user_resume_text, job_results):
+async def explain_matches_async(user_resume_text, job_results):
     # job_results comes from collection.query()
+    # Resume is truncated to 2000 chars to save tokens
     
     prompt = f"""
     Compare this candidate's Resume to these Job Results.
     Explain WHY they matched and what they are missing for the top match.
     
-    RESUME: {user_resume_text[:2000]} # Truncate to save tokens
+    RESUME: {user_resume_text[:2000]}
     
     JOBS FOUND: {job_results['documents'][0]}
     """
     
-    response = client.chat.completions.create(
+    response = await client.chat.completions.create(
         model="llama-3.3-70b-versatile",
         messages=[{"role": "user", "content": prompt}]
     )
-    return response.choices[0].message.content
\ No newline at end of file
+    return response.choices[0].message.content
+
+async def analyze_prompt_async(filter_prompt, resume_text, user_query=""):
+    """
+    Runs intent extraction and search-query synthesis concurrently.
+    Both only need the resume + user request, so we wait max(t_i) instead of sum(t_i).
+    """
+    filter_task = asyncio.create_task(get_filter_json_async(filter_prompt))
+    query_task = asyncio.create_task(get_search_query_llm_async(resume_text, user_query))
+    intent, search_q = await asyncio.gather(filter_task, query_task)
+    return intent, search_q
+
+# Sync wrappers for callers that are not async (Streamlit, search_script, CLI)
+def get_filter_json(user_prompt):
+    return _run(get_filter_json_async(user_prompt))
+
+def get_search_query_llm(resume_text, user_query=""):
+    return _run(get_search_query_llm_async(resume_text, user_query))
+
+def explain_matches(user_resume_text, job_results):
+    return _run(explain_matches_async(user_resume_text, job_results))
+
+def analyze_prompt(filter_prompt, resume_text, user_query=""):
+    """Returns (intent_dict, search_query_string) from two parallel Groq calls."""
+    return _run(analyze_prompt_async(filter_prompt, resume_text, user_query))
+
+# Quick manual check (kept out of module scope so importing never hits the API)
+if __name__ == "__main__":
+    print(get_filter_json("I want on-site junior roles in New York"))
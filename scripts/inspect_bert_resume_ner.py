@@ -30,16 +30,12 @@ State University — Boston, MA
 
 
 def main():
-    from transformers import pipeline
+    # Same loader as the real parser (int8 ONNX when optimum is installed)
+    from resume_ner_bert import build_ner_pipeline
 
     model_name = "yashpwr/resume-ner-bert-v2"
     print(f"Loading {model_name}...")
-    pipe = pipeline(
-        "token-classification",
-        model=model_name,
-        aggregation_strategy="simple",
-        device=-1,
-    )
+    pipe = build_ner_pipeline(model_name, aggregation_strategy="simple")
 
     # Show all labels the model knows (from config)
     if hasattr(pipe.model, "config") and hasattr(pipe.model.config, "id2label"):
@@ -59,25 +55,28 @@ def main():
     text = " ".join(SAMPLE.split())
     tokenizer = pipe.tokenizer
     max_tokens, overlap = 120, 30
-    tokens = tokenizer.encode(text, add_special_tokens=False, truncation=False)
+    # Tokenize once and slice the original text by character offsets, instead of
+    # decoding every window back to a string (fast tokenizers only)
+    enc = tokenizer(text, add_special_tokens=False, truncation=False, return_offsets_mapping=True)
+    tokens, offsets = enc["input_ids"], enc["offset_mapping"]
     if len(tokens) <= max_tokens:
         chunks = [text]
     else:
         chunks = []
         start = 0
         while start < len(tokens):
-            end = start + max_tokens
-            chunk_tokens = tokens[start:end]
-            chunks.append(tokenizer.decode(chunk_tokens, skip_special_tokens=True))
+            end = min(start + max_tokens, len(tokens))
+            chunks.append(text[offsets[start][0]:offsets[end - 1][1]])
             start = end - overlap
-            if start >= len(tokens):
+            if end >= len(tokens):
                 break
 
+    # One batched pipeline call: the model runs a few large forward passes
+    # instead of one small pass per chunk
+    chunks = [c for c in chunks if c.strip()]
+    outs = pipe(chunks, batch_size=8) if chunks else []
     raw = []
-    for ci, chunk in enumerate(chunks):
-        if not chunk.strip():
-            continue
-        out = pipe(chunk)
+    for ci, out in enumerate(outs):
         for item in out or []:
             item["_chunk"] = ci + 1
             raw.append(item)
@@ -1,4 +1,6 @@
-import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
 import json
 from pathlib import Path
 
@@ -12,15 +14,32 @@ def generate_metadata_cache():
     print(f"🔄 Loading CSV from: {CSV_PATH}")
     
     # Only load necessary columns to keep memory usage low
+    # Read straight into Arrow: no pandas frame / Python-object strings needed
     cols = ['location', 'formatted_experience_level', 'work_type']
-    df = pd.read_csv(CSV_PATH, usecols=cols).fillna("UNKNOWN")
+    table = pacsv.read_csv(
+        CSV_PATH,
+        # Job descriptions contain line breaks inside quoted fields
+        parse_options=pacsv.ParseOptions(newlines_in_values=True),
+        convert_options=pacsv.ConvertOptions(
+            include_columns=cols,
+            column_types={col: pa.string() for col in cols},
+            strings_can_be_null=True
+        )
+    )
+
+    def unique_values(col):
+        # Dedup in Arrow first, so Python only sorts the distinct values
+        return sorted(pc.unique(table[col].fill_null("UNKNOWN")).to_pylist())
 
     # 2. EXTRACT UNIQUE VALUES
     # We use a dictionary to keep it organized
+    locations = unique_values('location')
     cache = {
-        "locations": sorted(df['location'].unique().tolist()),
-        "experience_levels": sorted(df['formatted_experience_level'].unique().tolist()),
-        "work_types": sorted(df['work_type'].unique().tolist())
+        "locations": locations,
+        # Lower-cased once here so search_script's fuzzy match does no lowering at runtime
+        "locations_lower": [loc.lower() for loc in locations],
+        "experience_levels": unique_values('formatted_experience_level'),
+        "work_types": unique_values('work_type')
     }
 
     # 3. SAVE TO JSON
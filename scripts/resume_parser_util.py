@@ -1,26 +1,52 @@
+import io
+from concurrent.futures import ProcessPoolExecutor
 import fitz  # PyMuPDF
 import docx
 
+# In-memory uploads (e.g. Streamlit's getbuffer()) are parsed without a temp file
+BUFFER_TYPES = (bytes, bytearray, memoryview)
+
 def extract_text_from_pdf(pdf_path):
-    doc = fitz.open(pdf_path)
-    text = ""
-    for page in doc:
-        text += page.get_text("text")  # "text" layout preserves some structure
-    return text
+    """pdf_path can be a file path or the raw PDF bytes."""
+    if isinstance(pdf_path, BUFFER_TYPES):
+        doc = fitz.open(stream=bytes(pdf_path), filetype="pdf")
+    else:
+        doc = fitz.open(pdf_path)
+    # Collect pages and join once (repeated += is quadratic on long PDFs);
+    # the context manager closes the doc and frees MuPDF buffers right away
+    with doc:
+        return "".join(page.get_text("text") for page in doc)  # "text" layout preserves some structure
 
 def extract_text_from_word(file_path):
+    """file_path can be a file path or the raw DOCX bytes."""
+    if isinstance(file_path, BUFFER_TYPES):
+        file_path = io.BytesIO(file_path)
     doc = docx.Document(file_path)
     return "\n".join([para.text for para in doc.paragraphs])
 
-def extract_text_from_file(file_path):
+def extract_text_from_file(file_path, data=None):
+    """
+    Pick the parser from the file extension. If `data` (raw bytes) is given the
+    file is parsed from memory and file_path is only used for its extension.
+    """
     ext = file_path.split('.')[-1].lower()
+    source = file_path if data is None else data
     if ext == 'pdf':
-        return extract_text_from_pdf(file_path)
+        return extract_text_from_pdf(source)
     elif ext in ['docx', 'doc']:
-        return extract_text_from_word(file_path)
+        return extract_text_from_word(source)
     else:
         return ""
 
+def extract_texts_from_files(file_paths, max_workers=None):
+    """
+    Bulk version of extract_text_from_file for ingesting many resumes.
+    PDF parsing is CPU-bound, so files are spread over worker processes;
+    results come back in the same order as file_paths.
+    """
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(extract_text_from_file, file_paths, chunksize=8))
+
 # Test it with one sample PDFs
 if __name__ == "__main__":
     test_resume = "data/Unprocessed_cv/data/ENGINEERING/10030015.pdf"
@@ -1,5 +1,6 @@
-import json
+from itertools import islice
 from pathlib import Path
+import orjson
 
 # 1. SETUP PATHS DYNAMICALLY
 # This finds the folder where this script lives (scripts/)
@@ -12,12 +13,10 @@ file_path =  PROJECT_ROOT / "data" / "processed" / "combined_cv_data.jsonl"
 
 def sanity_check(limit=3):
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            for i, line in enumerate(f):
-                if i >= limit:
-                    break
-                
-                data = json.loads(line)
+        # Binary mode: orjson parses the raw bytes, no text decode step
+        with open(file_path, 'rb') as f:
+            for i, line in enumerate(islice(f, limit)):
+                data = orjson.loads(line)
                 text = data.get("text", "")
                 annotations = data.get("annotations", [])
                 
@@ -1,10 +1,24 @@
+import functools
+import hashlib
 import json
+import logging
+import mmap
 import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import chromadb
+import orjson
+import pyarrow as pa
+import pyarrow.compute as pc
 from chromadb.utils import embedding_functions
-from groq_prompter import get_filter_json, get_search_query_llm
 from resume_parser_util import extract_text_from_file
-from resume_ner_bert import parse_resume_ner_bert as parse_resume_ner
+# groq_prompter and resume_ner_bert are imported where they are used: the NER
+# module pulls in transformers + torch, which NER_applied=False never needs
+
+# Debug detail of each pipeline step; silent unless the caller enables DEBUG, so
+# the request path doesn't serialize on stdout (slow on Windows consoles)
+logger = logging.getLogger(__name__)
 
 # 1. SETUP PATHS & CONFIG
 DB_PATH = "data/job_vector_db"
@@ -13,39 +27,299 @@ COLLECTION_NAME = "linkedin_jobs"
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 CACHE_PATH = os.path.join(SCRIPT_DIR, "metadata_cache.json")
 
-# 2. INITIALIZE CHROMA & CACHE
-client = chromadb.PersistentClient(path=DB_PATH)
-emb_fn = embedding_functions.SentenceTransformerEmbeddingFunction(model_name="all-MiniLM-L6-v2")
-collection = client.get_collection(name=COLLECTION_NAME, embedding_function=emb_fn)
+# 2. LAZY CHROMA & CACHE
+# Nothing heavy happens at import: the client, embedding model and metadata cache
+# are built on first use (double-checked under one lock, so concurrent Streamlit
+# sessions don't load them twice) and then shared for the life of the process.
+_init_lock = threading.RLock()
+_client = None
+_emb_fn = None
+_collection = None
+_meta_cache = None
+# sqlite connections and the mmap'd HNSW index must not cross a fork: a worker
+# forked after the parent opened them (gunicorn --preload, multiprocessing)
+# opens its own instead of sharing the parent's handles
+_client_pid = None
+
+def _get_client():
+    global _client, _collection, _client_pid
+    if _client is None or _client_pid != os.getpid():
+        with _init_lock:
+            if _client is None or _client_pid != os.getpid():
+                _collection = None
+                _client = chromadb.PersistentClient(path=DB_PATH)
+                _client_pid = os.getpid()
+    return _client
+
+EMBED_MODEL = "all-MiniLM-L6-v2"
+
+# Tried in order. ONNX Runtime (sentence-transformers >= 3.2 with onnxruntime
+# installed) runs MiniLM's fused graph several times faster than eager PyTorch on
+# CPU; it falls back to the PyTorch model when the backend isn't available.
+# local_files_only first: a warm HF cache (shared across workers, hot in the OS
+# page cache) loads with no Hub revision checks; download only if missing.
+_EMBED_BACKENDS = (
+    {"backend": "onnx", "local_files_only": True},
+    {"backend": "onnx"},
+    {"local_files_only": True},
+    {},
+)
+
+def _load_embedding_function():
+    import torch
+    # Unit-length query vectors, the same as the ingested job vectors
+    # (job_vector_db.py encodes with normalize_embeddings=True)
+    common = {
+        "model_name": EMBED_MODEL,
+        "device": "cuda" if torch.cuda.is_available() else "cpu",
+        "normalize_embeddings": True,
+    }
+    for i, extra in enumerate(_EMBED_BACKENDS):
+        try:
+            return embedding_functions.SentenceTransformerEmbeddingFunction(**common, **extra)
+        except Exception:
+            if i == len(_EMBED_BACKENDS) - 1:
+                raise
+
+def _get_embedding_function():
+    global _emb_fn
+    if _emb_fn is None:
+        with _init_lock:
+            if _emb_fn is None:
+                _emb_fn = _load_embedding_function()
+    return _emb_fn
+
+def _get_collection():
+    global _collection
+    if _collection is None or _client_pid != os.getpid():
+        with _init_lock:
+            client = _get_client()  # reopens (and drops _collection) after a fork
+            if _collection is None:
+                _collection = client.get_collection(
+                    name=COLLECTION_NAME, embedding_function=_get_embedding_function()
+                )
+    return _collection
+
+def get_collection():
+    """
+    Shared per-process jobs collection. Servers can call this once at worker
+    startup so the sqlite + HNSW open isn't paid by the first request.
+    """
+    return _get_collection()
+
+def _scan_collection_metadata(page_size=5000):
+    """Rebuilds the metadata vocabulary from Chroma, one page at a time."""
+    collection = _get_collection()
+    locations, levels, work_types = set(), set(), set()
+    offset = 0
+    while True:
+        page = collection.get(include=["metadatas"], limit=page_size, offset=offset)["metadatas"]
+        if not page:
+            break
+        for meta in page:
+            locations.add(meta.get("location") or "UNKNOWN")
+            levels.add(meta.get("experience") or "UNKNOWN")
+            work_types.add(meta.get("work_type") or "UNKNOWN")
+        offset += len(page)
+    locations = sorted(locations)
+    return {
+        "locations": locations,
+        # Same layout as metadata_cache_db.py: lower-cased once at build time
+        "locations_lower": [loc.lower() for loc in locations],
+        "experience_levels": sorted(levels),
+        "work_types": sorted(work_types)
+    }
+
+def _load_meta_cache():
+    """
+    Fast-load metadata vocabulary from JSON. Only if the JSON is missing or older
+    than the Chroma DB (jobs re-ingested since) do we rescan and rewrite it.
+    """
+    db_file = os.path.join(DB_PATH, "chroma.sqlite3")
+    if os.path.exists(CACHE_PATH) and (
+        not os.path.exists(db_file) or os.path.getmtime(CACHE_PATH) >= os.path.getmtime(db_file)
+    ):
+        # orjson parses straight out of the mapped pages: no intermediate Python str
+        with open(CACHE_PATH, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            with memoryview(mm) as view:
+                return orjson.loads(view)
+
+    logger.info("Metadata cache missing or stale, rebuilding from the vector DB...")
+    cache = _scan_collection_metadata()
+    # Write a temp file next to the cache and swap it in atomically, so other
+    # processes deciding by mtime never map a half-written (or empty) file
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(CACHE_PATH), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(cache, f, indent=4)
+        os.replace(tmp_path, CACHE_PATH)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return cache
+
+def _get_meta_cache():
+    global _meta_cache
+    if _meta_cache is None:
+        with _init_lock:
+            if _meta_cache is None:
+                _meta_cache = _load_meta_cache()
+    return _meta_cache
 
-# Fast-load metadata vocabulary from JSON
-with open(CACHE_PATH, "r") as f:
-    META_CACHE = json.load(f)
-    UNIQUE_LOCATIONS = META_CACHE.get("locations", [])
+# Bound the $in filter so broad terms ("CA", "New") don't ship hundreds of values
+MAX_LOCATION_VARIATIONS = 32
+
+@functools.lru_cache(maxsize=1)
+def _get_location_index():
+    """
+    (locations, lower-cased locations, location set), derived once.
+    Both location columns are Arrow string arrays: packed UTF-8 buffers, so the
+    substring scan and the lower-casing run in Arrow's C kernels instead of
+    Python loops over per-string objects.
+    """
+    meta = _get_meta_cache()
+    locations = meta.get("locations", [])
+    locations_arr = pa.array(locations, type=pa.string())
+    # Prefer the build-time lower-cased column (same str.lower() as the needle);
+    # caches written before it existed fall back to lowering in Arrow
+    locations_lower = meta.get("locations_lower")
+    if locations_lower is not None and len(locations_lower) == len(locations):
+        lower_arr = pa.array(locations_lower, type=pa.string())
+    else:
+        lower_arr = pc.utf8_lower(locations_arr)
+    return locations_arr, lower_arr, set(locations)
 
 def get_fuzzy_locations(user_loc):
     """Finds existing DB tags that contain the user's location string."""
     if not user_loc: return []
-    return [loc for loc in UNIQUE_LOCATIONS if user_loc.lower() in loc.lower()]
+    locations, locations_lower, _ = _get_location_index()
+    mask = pc.match_substring(locations_lower, user_loc.lower())
+    return locations.filter(mask).to_pylist()
+
+# Query text -> embedding. Streamlit reruns resend identical queries, so each
+# distinct one is embedded only once (bounded, oldest dropped first)
+QUERY_EMBED_CACHE_SIZE = 256
+_query_embeddings = {}
+_query_embeddings_lock = threading.Lock()
+
+def _embed_queries(query_texts):
+    """Embeds the cache misses in one batched model call, outside Chroma's query."""
+    # Hits are copied out under the lock: another session's eviction can drop them
+    # from the shared dict before this call builds its result
+    with _query_embeddings_lock:
+        found = {q: _query_embeddings[q] for q in query_texts if q in _query_embeddings}
+    missing = [q for q in dict.fromkeys(query_texts) if q not in found]
+    if missing:
+        fresh = dict(zip(missing, _get_embedding_function()(missing)))
+        found.update(fresh)
+        with _query_embeddings_lock:
+            _query_embeddings.update(fresh)
+            while len(_query_embeddings) > QUERY_EMBED_CACHE_SIZE:
+                _query_embeddings.pop(next(iter(_query_embeddings)))
+    return [found[q] for q in query_texts]
+
+@functools.lru_cache(maxsize=32)
+def _resume_ner(resume_text):
+    """NER only depends on the resume, so follow-up chat turns reuse the first pass."""
+    from resume_ner_bert import parse_resume_ner_bert as parse_resume_ner
+    return parse_resume_ner(resume_text)
+
+# Local BERT NER (CPU) and the Groq calls (network) are independent, so NER runs
+# on this worker while the caller waits on Groq: wall time is max(), not sum().
+# Per process like the Chroma client: a forked child inherits the executor but not
+# its worker thread, so it gets a fresh one.
+_ner_executor = None
+_ner_executor_pid = None
+
+def _get_ner_executor():
+    global _ner_executor, _ner_executor_pid
+    if _ner_executor is None or _ner_executor_pid != os.getpid():
+        with _init_lock:
+            if _ner_executor is None or _ner_executor_pid != os.getpid():
+                _ner_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="resume-ner")
+                _ner_executor_pid = os.getpid()
+    return _ner_executor
+
+def _start_ner(resume_text, NER_applied):
+    """Returns a future for the resume's NER tags, or None when NER is off."""
+    if not NER_applied:
+        return None
+    return _get_ner_executor().submit(_resume_ner, resume_text[:RESUME_HEAD_CHARS])
+
+# Intent extraction and NER both look at the same resume head, which also keeps
+# BERT NER cost bounded (a handful of chunks) however long the CV is
+RESUME_HEAD_CHARS = 2000
+
+# Parsed resume text keyed by file content hash, so re-running the same file with
+# different flags/queries skips the PDF/DOCX parse (bounded, oldest dropped first)
+RESUME_TEXT_CACHE_SIZE = 32
+_resume_texts = {}
+_resume_texts_lock = threading.Lock()
 
 # 3. THE SMART SEARCH PIPELINE
+def read_resume_file(file_path):
+    """Extracts resume text, reusing the parse when the same file content comes back."""
+    logger.debug("Processing: %s", os.path.basename(file_path))
+    with open(file_path, "rb") as f:
+        raw = f.read()
+    file_hash = hashlib.sha1(raw).hexdigest()
+    with _resume_texts_lock:
+        resume_text = _resume_texts.get(file_hash)
+    if resume_text is None:
+        # Parse outside the lock so concurrent uploads don't queue behind each other
+        resume_text = extract_text_from_file(file_path, data=raw)
+        with _resume_texts_lock:
+            _resume_texts[file_hash] = resume_text
+            while len(_resume_texts) > RESUME_TEXT_CACHE_SIZE:
+                _resume_texts.pop(next(iter(_resume_texts)))
+    return resume_text
+
 def smart_search_with_file(file_path, additional_query="", NER_applied=True, LLM_applied=True):
     """
     Run the smart search pipeline on a resume file plus an optional free-text query.
     Returns a tuple of (results_dict_or_None, intent_dict).
     """
     # STEP A: Extract Resume Text
-    print(f"Processing: {os.path.basename(file_path)}")
-    print(additional_query)
-    resume_text = extract_text_from_file(file_path)
+    resume_text = read_resume_file(file_path)
+    return smart_search(resume_text, additional_query, NER_applied, LLM_applied)
+
+def smart_search(resume_text, additional_query="", NER_applied=True, LLM_applied=True):
+    """
+    Same pipeline as smart_search_with_file, for callers that already hold the
+    resume text (e.g. the Streamlit app caching parsed uploads).
+    Identical (resume, query, flags) calls are answered from an in-process memo;
+    NER is cached per resume separately, so toggling NER_applied only pays for NER.
+    If the search was skipped (no search text and no filters), results is None and
+    intent["notice"] explains why.
+    """
+    return _smart_search_cached(resume_text, additional_query, NER_applied, LLM_applied)
+
+def _get_intent(resume_text, additional_query, LLM_applied):
+    """STEP B: Returns (intent, llm_query_or_None), from the local fast path or Groq."""
+    from groq_prompter import get_filter_json, analyze_prompt, get_search_query_llm, quick_filter
+    llm_query = None
+    # Simple preferences that state level, work type, title and a known DB location
+    # ("senior full time python developer in London") are parsed locally; only the
+    # search summary still needs Groq
+    intent = quick_filter(additional_query, lambda loc: bool(get_fuzzy_locations(loc)))
+    if intent is not None:
+        if LLM_applied:
+            llm_query = get_search_query_llm(resume_text, additional_query)
+        logger.debug("Extracted Intent (local): %s", intent)
+        return intent, llm_query
 
-    # STEP B: Get Intent via Groq
     # We pass both the resume (for skills) and query (for specific filters)
-    combined_input = f"RESUME: {resume_text[:2000]}\nUSER PREFERENCES: {additional_query}"
-    intent = get_filter_json(combined_input)
-    print(f"Extracted Intent: {intent}")
+    combined_input = f"RESUME: {resume_text[:RESUME_HEAD_CHARS]}\nUSER PREFERENCES: {additional_query}"
+    if LLM_applied:
+        # Intent + LLM search summary are independent, so fire both Groq calls at once
+        intent, llm_query = analyze_prompt(combined_input, resume_text, additional_query)
+    else:
+        intent = get_filter_json(combined_input)
+    logger.debug("Extracted Intent: %s", intent)
+    return intent, llm_query
 
-    # STEP C: Build Chroma Filter using Cache
+def _build_where(intent):
+    """STEP C: Build Chroma Filter using Cache"""
     where_clauses = []
 
     # Standard exact filters
@@ -56,54 +330,68 @@ def smart_search_with_file(file_path, additional_query="", NER_applied=True, LLM
 
     # Fuzzy Location Expansion (Matches user "NYC" to "New York, NY" from cache)
     if intent.get("location"):
-        loc_variations = get_fuzzy_locations(intent["location"])
-        if loc_variations:
-            where_clauses.append({"location": {"$in": loc_variations}})
+        if intent["location"] in _get_location_index()[2]:
+            # Exact DB tag: plain equality, no substring scan or $in list
+            where_clauses.append({"location": intent["location"]})
+        else:
+            loc_variations = get_fuzzy_locations(intent["location"])[:MAX_LOCATION_VARIATIONS]
+            if loc_variations:
+                where_clauses.append({"location": {"$in": loc_variations}})
 
-    # Combine into final 'where' dict
+    # Combine into final 'where' dict (Chroma only accepts one field per dict,
+    # so several predicates must go through $and)
     final_where = None
     if len(where_clauses) > 1:
         final_where = {"$and": where_clauses}
     elif len(where_clauses) == 1:
         final_where = where_clauses[0]
+    return final_where
 
-    # STEP D: Build the "Rich Query" (The Booster Logic)
+def _build_rich_query(additional_query, intent, llm_query, ner_output):
+    """STEP D: Build the "Rich Query" (The Booster Logic). ner_output=None skips NER."""
     # 1. Start with the basic title or user query
     base_query = intent.get("title") or additional_query or ""
     
     boost_parts = [base_query]
 
     # 2. Add LLM Semantic Summary (High Level Reasoning)
-    if LLM_applied:
-        llm_query = get_search_query_llm(resume_text, additional_query)
+    if llm_query:
         boost_parts.append(llm_query)
-        print(f"🤖 LLM Boost: {llm_query}")
+        logger.debug("LLM Boost: %s", llm_query)
 
     # 3. Add NER Tags (Granular Keywords)
-    if NER_applied:
-        ner_output = parse_resume_ner(resume_text)
-        # Extract and clean tags longer than 2 chars
-        ner_tags = [s for k in ner_output for s in ner_output[k] if len(s) > 2]
+    if ner_output is not None:
+        # Extract and clean tags longer than 2 chars (one pass over all labels)
+        ner_tags = [s for tags in ner_output.values() for s in tags if len(s) > 2]
         if ner_tags:
             boost_parts.append(" ".join(ner_tags))
-            print(f"🏷️ NER Boost: {len(ner_tags)} tags added.")
+            logger.debug("NER Boost: %d tags added.", len(ner_tags))
 
     # Join everything into one big semantic string
-    rich_query = " ".join(boost_parts)
+    return " ".join(boost_parts)
 
-    # STEP E: Query Database
-    results = collection.query(
-        query_texts=[rich_query],
-        n_results=5,
-        where=final_where,
-    )
+# Returned in intent["notice"] when a search is skipped, for the UI to show as-is
+NO_SEARCH_TERMS_NOTICE = (
+    "I couldn't pick out a role, location or other filter from your request. "
+    "Try adding a job title or a location, e.g. \"data analyst in London\"."
+)
+
+# Only the fields the UI/CLI render; never pull stored embeddings back into Python
+QUERY_INCLUDE = ["metadatas", "documents", "distances"]
 
-    # STEP E: Output Results (for debugging / CLI use)
+def _matches_or_none(results):
+    """Results dict, or None if nothing matched (formatting is left to the caller)."""
+    if not results["documents"][0]:
+        logger.debug("No matches found with these filters.")
+        return None
+    return results
+
+def print_matches(results):
+    """STEP F: Output Results (CLI use)."""
     print(f"\n{'='*60}\n🔍 MATCHES FOR YOUR PROFILE\n{'='*60}")
-    if not results["ids"][0]:
+    if not results:
         print("No matches found with these filters. Try broader criteria.")
-        # Still return the intent so the caller can surface it in the UI
-        return None, intent
+        return
 
     for i in range(len(results["ids"][0])):
         meta = results["metadatas"][0][i]
@@ -113,13 +401,79 @@ def smart_search_with_file(file_path, additional_query="", NER_applied=True, LLM
         print(f"    📍 {meta['location']} | {meta['work_type']} | Match: {score}%")
         print(f"    📝 {results['documents'][0][i][:160]}...\n")
 
+@functools.lru_cache(maxsize=128)
+def _smart_search_cached(resume_text, additional_query, NER_applied, LLM_applied):
+    logger.debug("Additional query: %s", additional_query)
+    ner_future = _start_ner(resume_text, NER_applied)
+    intent, llm_query = _get_intent(resume_text, additional_query, LLM_applied)
+    final_where = _build_where(intent)
+    ner_output = ner_future.result() if ner_future else None
+    rich_query = _build_rich_query(additional_query, intent, llm_query, ner_output)
+    if final_where is None and not rich_query.strip():
+        # Nothing to filter or rank by: skip a meaningless walk over the whole index
+        logger.debug("No search terms or filters extracted; skipping the query.")
+        return None, {**intent, "notice": NO_SEARCH_TERMS_NOTICE}
+
+    # STEP E: Query Database
+    results = _get_collection().query(
+        query_embeddings=_embed_queries([rich_query]),
+        n_results=5,
+        where=final_where,
+        include=QUERY_INCLUDE,
+    )
+
     # Return both the raw results and the parsed intent for use in the frontend
-    return results, intent
+    # (intent is returned even with no matches so the caller can surface it in the UI)
+    return _matches_or_none(results), intent
+
+# Per-query fields of a Chroma QueryResult (outer list = one entry per query)
+_RESULT_FIELDS = ("ids", "distances", "metadatas", "documents", "embeddings", "uris", "data")
+
+def smart_search_batch(resume_text, additional_query="", variants=((False, False), (True, True))):
+    """
+    Runs several (NER_applied, LLM_applied) variants of one search, e.g. to compare
+    boosters. Groq, the filter and NER run once, and every variant's rich query goes
+    through a single collection.query (one Python->Rust hop, one filter pass).
+    Returns a list of (results_dict_or_None, intent_dict), one per variant.
+    """
+    logger.debug("Additional query: %s", additional_query)
+    ner_future = _start_ner(resume_text, any(ner for ner, _ in variants))
+    intent, llm_query = _get_intent(resume_text, additional_query, any(llm for _, llm in variants))
+    final_where = _build_where(intent)
+    ner_output = ner_future.result() if ner_future else None
+    rich_queries = [
+        _build_rich_query(additional_query, intent, llm_query if llm else None, ner_output if ner else None)
+        for ner, llm in variants
+    ]
+    if final_where is None and not any(q.strip() for q in rich_queries):
+        logger.debug("No search terms or filters extracted; skipping the query.")
+        return [(None, {**intent, "notice": NO_SEARCH_TERMS_NOTICE}) for _ in rich_queries]
+
+    batch = _get_collection().query(
+        query_embeddings=_embed_queries(rich_queries),
+        n_results=5,
+        where=final_where,
+        include=QUERY_INCLUDE,
+    )
+
+    outputs = []
+    for j in range(len(rich_queries)):
+        results = {k: (v[j:j + 1] if k in _RESULT_FIELDS and v is not None else v) for k, v in batch.items()}
+        outputs.append((_matches_or_none(results), intent))
+    return outputs
 
 
 # 4. OPTIONAL: CLI TEST ENTRYPOINT
 if __name__ == "__main__":
     # Example: Pass a PDF/Doc and a specific location constraint
     test_file = r"C:\Vasanth\Important stuff\Resumes\Vasanth Subramanian Resume.pdf"
-    smart_search_with_file(test_file, "Software Engineer in New York", NER_applied=False, LLM_applied=False)
-    smart_search_with_file(test_file, "Software Engineer in New York", NER_applied=True, LLM_applied=True)
\ No newline at end of file
+    # Show this module's step-by-step detail without third-party debug noise
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    logger.setLevel(logging.DEBUG)
+    # Plain search vs. NER + LLM boosted search, sharing one Chroma query
+    for results, intent in smart_search_batch(read_resume_file(test_file), "Software Engineer in New York",
+                                         variants=((False, False), (True, True))):
+        if intent.get("notice"):
+            print(intent["notice"])
+        else:
+            print_matches(results)
\ No newline at end of file